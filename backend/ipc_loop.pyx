@@ -0,0 +1,189 @@
+# backend/ipc_loop.pyx
+# distutils: extra_compile_args = -O3 -march=native
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""
+Optional compiled fast path for python_bidirectional_ipc_script.py.
+
+Runs the whole Acceptor polling loop (wait for command, wait for the Creator to
+free the A2C buffer, publish length/status, acknowledge) in C over its own
+mapping of the SHM segment. Only the actual processing is a Python call.
+
+Build in place (from backend/):
+    cythonize -i ipc_loop.pyx
+
+When the extension is not built, the script keeps using its pure-Python loop.
+"""
+
+from libc.stdint cimport int32_t
+from libc.stddef cimport size_t
+from cpython.exc cimport PyErr_CheckSignals
+
+import logging
+
+log = logging.getLogger('ipc')  # Same logger (and handler/level) as the script
+
+cdef extern from "sys/mman.h":
+    void *mmap(void *addr, size_t length, int prot, int flags, int fd, long offset)
+    int munmap(void *addr, size_t length)
+    int PROT_READ
+    int PROT_WRITE
+    int MAP_SHARED
+    void *MAP_FAILED
+
+cdef extern from *:
+    """
+    #include <stdint.h>
+    #include <stddef.h>
+    #include <time.h>
+    #include <unistd.h>
+    #ifdef __linux__
+    #include <linux/futex.h>
+    #include <sys/syscall.h>
+    #endif
+
+    /* Must match SharedIPCBidirectional in python_ipc.h (natural alignment). */
+    typedef struct {
+        int32_t c_to_a_command;
+        size_t  c_to_a_data_len;
+        int32_t a_to_c_status;
+        size_t  a_to_c_data_len;
+        size_t  defined_c2a_buffer_size;
+        size_t  defined_a2c_buffer_size;
+        char    _padding1[80];
+    } ipc_control_t;
+    _Static_assert(sizeof(ipc_control_t) == 128, "ipc_control_t must be 128 bytes");
+
+    static inline int32_t ipc_load_i32(int32_t *p) { return __atomic_load_n(p, __ATOMIC_ACQUIRE); }
+    static inline void ipc_store_i32(int32_t *p, int32_t v) { __atomic_store_n(p, v, __ATOMIC_RELEASE); }
+    static inline size_t ipc_load_size(size_t *p) { return __atomic_load_n(p, __ATOMIC_ACQUIRE); }
+    static inline void ipc_store_size(size_t *p, size_t v) { __atomic_store_n(p, v, __ATOMIC_RELEASE); }
+
+    /* Block while *p == expected, for at most timeout_us (short sleep where futex is unavailable). */
+    static void ipc_futex_wait(int32_t *p, int32_t expected, long timeout_us) {
+    #ifdef __linux__
+        struct timespec ts;
+        ts.tv_sec = timeout_us / 1000000;
+        ts.tv_nsec = (timeout_us % 1000000) * 1000;
+        syscall(SYS_futex, p, FUTEX_WAIT, expected, &ts, NULL, 0);
+    #else
+        (void)p; (void)expected; (void)timeout_us;
+        usleep(500);
+    #endif
+    }
+
+    static void ipc_futex_wake(int32_t *p) {
+    #ifdef __linux__
+        syscall(SYS_futex, p, FUTEX_WAKE, INT32_MAX, NULL, NULL, 0);
+    #else
+        (void)p;
+    #endif
+    }
+
+    /* Spin, then block until *p != expected or the timeout elapses. Returns the last value read. */
+    static int32_t ipc_wait_while_equal(int32_t *p, int32_t expected, int spin, long timeout_us) {
+        int32_t v;
+        for (int i = 0; i < spin; ++i) {
+            v = ipc_load_i32(p);
+            if (v != expected) return v;
+        }
+        ipc_futex_wait(p, expected, timeout_us);
+        return ipc_load_i32(p);
+    }
+    """
+    ctypedef struct ipc_control_t:
+        int32_t c_to_a_command
+        size_t c_to_a_data_len
+        int32_t a_to_c_status
+        size_t a_to_c_data_len
+        size_t defined_c2a_buffer_size
+        size_t defined_a2c_buffer_size
+
+    int32_t ipc_load_i32(int32_t *p) nogil
+    void ipc_store_i32(int32_t *p, int32_t v) nogil
+    size_t ipc_load_size(size_t *p) nogil
+    void ipc_store_size(size_t *p, size_t v) nogil
+    void ipc_futex_wake(int32_t *p) nogil
+    int32_t ipc_wait_while_equal(int32_t *p, int32_t expected, int spin, long timeout_us) nogil
+
+cdef enum:
+    CONTROL_BLOCK_SIZE = 128
+    SPIN_COUNT = 20000
+    WAIT_SLICE_US = 100000      # Re-check signals / keep_running at least this often
+    READY_TIMEOUT_SLICES = 50   # 5 s for the Creator to consume the previous response
+
+cdef bint _wait_creator_ready(ipc_control_t *ctrl, object keep_running) except -1:
+    """Waits until a_to_c_status == 0. Returns False on shutdown or timeout."""
+    cdef int32_t status
+    cdef int slices = 0
+    while True:
+        with nogil:
+            status = ipc_load_i32(&ctrl.a_to_c_status)
+            if status != 0:
+                status = ipc_wait_while_equal(&ctrl.a_to_c_status, status, SPIN_COUNT, WAIT_SLICE_US)
+        if status == 0:
+            return True
+        PyErr_CheckSignals()
+        if keep_running is not None and not keep_running():
+            log.warning("[IPC Cython Acceptor] Shutdown requested while waiting to send.")
+            return False
+        slices += 1
+        if slices >= READY_TIMEOUT_SLICES:
+            log.error("[IPC Cython Acceptor] Error: Timeout waiting for Creator ack.")
+            return False
+
+cdef void _publish(ipc_control_t *ctrl, size_t data_len, int32_t status) noexcept nogil:
+    # Length first, then status (release), then wake the Creator's listener
+    ipc_store_size(&ctrl.a_to_c_data_len, data_len)
+    ipc_store_i32(&ctrl.a_to_c_status, status)
+    ipc_futex_wake(&ctrl.a_to_c_status)
+
+def run_loop(int fd, size_t total_size, object py_callback, object keep_running=None):
+    """Runs the Acceptor loop until the Creator sends shutdown (99) or keep_running() is False.
+
+    py_callback(c2a_data_len) must write the response into the A2C buffer (through the
+    caller's own mapping of the same segment) and return its length in bytes.
+    """
+    cdef void *base = mmap(NULL, total_size, PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0)
+    if base == MAP_FAILED:
+        raise OSError("ipc_loop: mmap failed")
+    cdef ipc_control_t *ctrl = <ipc_control_t *>base
+    cdef size_t a2c_offset = CONTROL_BLOCK_SIZE + ctrl.defined_c2a_buffer_size
+    cdef size_t max_response = ctrl.defined_a2c_buffer_size
+    cdef int32_t command
+    cdef long response_len
+    if a2c_offset > total_size:
+        munmap(base, total_size)
+        raise ValueError("ipc_loop: SHM buffer sizes exceed the mapped size")
+    if total_size - a2c_offset < max_response:
+        max_response = total_size - a2c_offset
+
+    try:
+        while True:
+            with nogil:
+                command = ipc_wait_while_equal(&ctrl.c_to_a_command, 0, SPIN_COUNT, WAIT_SLICE_US)
+            if command == 0:
+                PyErr_CheckSignals()
+                if keep_running is not None and not keep_running():
+                    return
+                continue
+
+            try:
+                if command == 1: # Data Ready from Creator
+                    if _wait_creator_ready(ctrl, keep_running):
+                        response_len = py_callback(ipc_load_size(&ctrl.c_to_a_data_len))
+                        if 0 <= response_len <= <long>max_response:
+                            _publish(ctrl, <size_t>response_len, 1)
+                        else:
+                            log.error(f"[IPC Cython Acceptor] Error: Response size ({response_len}) exceeds A2C buffer ({max_response}). Signaling error.")
+                            _publish(ctrl, 0, -1)
+                elif command == 99: # Shutdown command from Creator
+                    log.info("[IPC Cython Acceptor] Received shutdown command (99). Acknowledging and exiting.")
+                    return
+                else:
+                    log.warning(f"[IPC Cython Acceptor] Warning: Unknown command {command} received from Creator. Resetting.")
+            finally:
+                # Single acknowledgement point, same as the Python loop
+                ipc_store_i32(&ctrl.c_to_a_command, 0)
+                ipc_futex_wake(&ctrl.c_to_a_command)
+    finally:
+        munmap(base, total_size)
@@ -1,8 +1,5 @@
 # native/plugins/python_bidirectional_ipc_script.py
 import sys
-# Add print statement immediately after initial imports
-print(f"[IPC Python EXEC] Script execution started. Args: {sys.argv}")
-
 import time
 import ctypes
 import mmap # Use mmap directly
@@ -13,24 +10,73 @@ import numpy as np
 import cv2 # Assuming OpenCV is still needed for processing
 import struct
 import fcntl
+import platform
+import logging
+
+# --- Logging ---
+# All diagnostics go through `log` to stdout. Default level is WARNING, so init
+# chatter and per-transaction lines (hex previews, progress) are skipped without
+# formatting; IPC_DEBUG=1 enables everything down to DEBUG.
+DEBUG = os.environ.get('IPC_DEBUG') == '1'
+log = logging.getLogger('ipc')
+log.propagate = False
+_log_handler = logging.StreamHandler(sys.stdout)
+_log_handler.setFormatter(logging.Formatter('%(message)s'))
+log.addHandler(_log_handler)
+log.setLevel(logging.DEBUG if DEBUG else logging.WARNING)
+log.debug("[IPC Python EXEC] Script execution started. Args: %s", sys.argv)
 
 # --- Helper function to get hex preview of bytes (Python version) ---
 def bytesToHexPreview(bytes_data: bytes, max_bytes: int = 30) -> str:
+    """Accepts bytes or a memoryview; uses the C-implemented .hex() instead of per-byte formatting."""
     if not bytes_data or len(bytes_data) == 0:
         return "(no binary data)"
     
-    byte_to_hex = lambda byte: format(byte, '02X') # Use format for uppercase hex
-    
     length = len(bytes_data)
-    preview = ""
-
     if length <= max_bytes * 2:
-        preview = ' '.join(map(byte_to_hex, bytes_data))
-    else:
-        first_part = ' '.join(map(byte_to_hex, bytes_data[:max_bytes]))
-        last_part = ' '.join(map(byte_to_hex, bytes_data[length - max_bytes:]))
-        preview = f"First {max_bytes}: {first_part} ... Last {max_bytes}: {last_part}"
-    return preview
+        return bytes_data.hex(' ').upper()
+    first_part = bytes_data[:max_bytes].hex(' ').upper()
+    last_part = bytes_data[length - max_bytes:].hex(' ').upper()
+    return f"First {max_bytes}: {first_part} ... Last {max_bytes}: {last_part}"
+# ---------------------------------------------------------------------
+
+# --- Optional Numba JIT for the command spin loop ---
+try:
+    from numba import njit, types
+    from numba.core import cgutils
+    from numba.extending import intrinsic
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+# ---------------------------------------------------------------------
+
+# --- Optional compiled IPC loop (see ipc_loop.pyx; build with `cythonize -i ipc_loop.pyx`) ---
+# IPC_PURE_PYTHON=1 forces the Python loop even when the extension is built.
+ipc_loop = None
+if os.environ.get('IPC_PURE_PYTHON') != '1':
+    try:
+        import ipc_loop
+    except ImportError:
+        ipc_loop = None
+# ---------------------------------------------------------------------
+
+# --- Example Processing Input (static, built once at import) ---
+# 10x10 horizontal gray gradient, same values as the old per-pixel loop
+# (int(i * 255 / (width - 1))). Each request converts it to RGBA with a
+# single GRAY2RGBA pass (alpha = 255) directly into the SHM A2C buffer.
+EXAMPLE_WIDTH, EXAMPLE_HEIGHT = 10, 10
+_GRADIENT_ROW = (np.arange(EXAMPLE_WIDTH) * (255.0 / (EXAMPLE_WIDTH - 1))).astype(np.uint8)
+_GRADIENT_GRAY = np.empty((EXAMPLE_HEIGHT, EXAMPLE_WIDTH), dtype=np.uint8)
+_GRADIENT_GRAY[:] = _GRADIENT_ROW
+EXAMPLE_RESPONSE_LEN = EXAMPLE_HEIGHT * EXAMPLE_WIDTH * 4
+
+# Fixed status/error replies, pre-encoded so staging one is a single copy into SHM
+def _encode_reply(text):
+    return np.frombuffer(text.encode('ascii'), dtype=np.uint8)
+REPLY_CREATOR_DATA_TOO_LARGE = _encode_reply("Error: Creator data too large")
+REPLY_RESPONSE_TOO_LARGE = _encode_reply("Error: Response too large for A2C buffer")
+REPLY_PROCESSING_ERROR = _encode_reply("Error during Python processing")
+REPLY_EMPTY_ACK = _encode_reply("Acknowledged empty Creator message")
 # ---------------------------------------------------------------------
 
 # --- Constants (REMOVED - Sizes now read from SHM) ---
@@ -47,13 +93,15 @@ S_IWGRP = 0o020
 S_IROTH = 0o004
 S_IWOTH = 0o002
 DEFAULT_SHM_MODE = S_IRUSR | S_IWUSR | S_IRGRP | S_IWGRP | S_IROTH | S_IWOTH # 0666
+# <sys/mman.h>: Linux-only (exposed by Python 3.10+); elsewhere pages are touched after mapping
+MAP_POPULATE = getattr(mmap, "MAP_POPULATE", 0)
 # -----------------------------------------------------
 
 # --- Load Standard C Library --- 
 try:
-    libc = ctypes.CDLL(None) # Use None to let ctypes find libc
+    libc = ctypes.CDLL(None, use_errno=True) # Use None to let ctypes find libc; use_errno so ctypes.get_errno() is valid
 except OSError as e:
-    print(f"[IPC Python] Error loading libc: {e}. Cannot use POSIX functions via ctypes.")
+    log.error(f"[IPC Python] Error loading libc: {e}. Cannot use POSIX functions via ctypes.")
     sys.exit(1)
 
 # --- Define ctypes function prototypes --- 
@@ -63,7 +111,7 @@ try:
     c_shm_open.argtypes = [ctypes.c_char_p, ctypes.c_int, ctypes.c_int]
     c_shm_open.restype = ctypes.c_int
 except AttributeError:
-     print(f"[IPC Python] Error: libc.shm_open not found. Is this a POSIX system?")
+     log.error(f"[IPC Python] Error: libc.shm_open not found. Is this a POSIX system?")
      sys.exit(1)
 
 # int close(int fd);
@@ -72,11 +120,72 @@ try:
     c_close.argtypes = [ctypes.c_int]
     c_close.restype = ctypes.c_int
 except AttributeError:
-     print(f"[IPC Python] Error: libc.close not found.")
+     log.error(f"[IPC Python] Error: libc.close not found.")
      # Non-fatal, might still work but can't close FD
      c_close = None 
 
+# Yield the CPU between spin reads so a ready producer on the same core can run.
+# os.sched_yield covers Linux and macOS; fall back to libc via ctypes otherwise.
+sched_yield = getattr(os, "sched_yield", None)
+if sched_yield is None:
+    try:
+        sched_yield = libc.sched_yield
+        sched_yield.argtypes = []
+        sched_yield.restype = ctypes.c_int
+    except AttributeError:
+        sched_yield = lambda: time.sleep(0)
+
+# --- Futex (Linux only) ---
+# long syscall(SYS_futex, uint32_t *uaddr, int futex_op, uint32_t val,
+#              const struct timespec *timeout, uint32_t *uaddr2, uint32_t val3);
+# Lets the poll loops block in the kernel on a 4-byte SHM control word until
+# the C++ side changes it and issues FUTEX_WAKE, instead of sleeping blindly.
+# Other platforms (e.g. macOS) fall back to short sleeps.
+FUTEX_WAIT = 0
+FUTEX_WAKE = 1
+FUTEX_WAKE_ALL = 0x7FFFFFFF
+FUTEX_SPIN_COUNT = 100         # Read + sched_yield rounds before blocking in the kernel
+CREATOR_READY_SPIN_COUNT = 200 # Same, for a_to_c_status before the clocked futex phase
+FUTEX_WAIT_TIMEOUT_SEC = 0.1   # Upper bound per wait so `running` is re-checked
+FALLBACK_POLL_SEC = 0.0005     # Sleep used when futex is unavailable (matches the C++ fallback)
+SYS_futex = None
+if sys.platform.startswith("linux"):
+    SYS_futex = {"x86_64": 202, "aarch64": 98}.get(platform.machine())
+
+class Timespec(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+c_syscall = None
+if SYS_futex is not None:
+    try:
+        c_syscall = libc.syscall
+        c_syscall.argtypes = [ctypes.c_long, ctypes.c_void_p, ctypes.c_int, ctypes.c_uint32,
+                              ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint32]
+        c_syscall.restype = ctypes.c_long
+    except AttributeError:
+        log.warning(f"[IPC Python] Warning: libc.syscall not found. Falling back to sleep polling.")
+        c_syscall = None
+
+_futex_timeout = Timespec(int(FUTEX_WAIT_TIMEOUT_SEC), int((FUTEX_WAIT_TIMEOUT_SEC % 1) * 1e9))
+_futex_timeout_ref = ctypes.byref(_futex_timeout)
+
+def futex_wait(addr, expected):
+    """Blocks while the u32 at addr equals expected (bounded by FUTEX_WAIT_TIMEOUT_SEC)."""
+    if c_syscall is None or addr is None:
+        time.sleep(FALLBACK_POLL_SEC)
+        return
+    c_syscall(SYS_futex, addr, FUTEX_WAIT, expected & 0xFFFFFFFF, _futex_timeout_ref, None, 0)
+
+def futex_wake(addr):
+    """Wakes the C++ side if it is blocked on the u32 at addr."""
+    if c_syscall is not None and addr is not None:
+        c_syscall(SYS_futex, addr, FUTEX_WAKE, FUTEX_WAKE_ALL, None, None, 0)
+
 # --- Shared Memory Structure Definition (Matches C++ Creator/Acceptor) --- 
+# Natural alignment, same as the (unpacked) C++ struct. Layout on 64-bit:
+#   0 c_to_a_command | 4 pad | 8 c_to_a_data_len | 16 a_to_c_status | 20 pad |
+#   24 a_to_c_data_len | 32 defined_c2a_buffer_size | 40 defined_a2c_buffer_size |
+#   48 _padding1[80] | 128 end of control block
 class SharedIPCBidirectional(ctypes.Structure):
     _fields_ = [
         # Creator -> Acceptor
@@ -89,170 +198,282 @@ class SharedIPCBidirectional(ctypes.Structure):
         ("defined_c2a_buffer_size", ctypes.c_size_t), 
         ("defined_a2c_buffer_size", ctypes.c_size_t),
         # Padding
-        ("_padding1", ctypes.c_char * (128 - ctypes.sizeof(ctypes.c_int32)*2 - ctypes.sizeof(ctypes.c_size_t)*4)),
+        ("_padding1", ctypes.c_char * 80),
     ]
 
+# Fail loudly on ABI drift instead of silently reading shifted offsets
+assert ctypes.sizeof(SharedIPCBidirectional) == 128, \
+    f"SharedIPCBidirectional is {ctypes.sizeof(SharedIPCBidirectional)} bytes, expected 128"
+
+# NumPy structured view of the same control block. The ctypes struct above is
+# only used during init; the hot paths load/store fields through this dtype.
+CTRL_DTYPE = np.dtype([
+    ("c_to_a_command", np.int32),
+    ("c_to_a_data_len", np.uintp),
+    ("a_to_c_status", np.int32),
+    ("a_to_c_data_len", np.uintp),
+    ("defined_c2a_buffer_size", np.uintp),
+    ("defined_a2c_buffer_size", np.uintp),
+], align=True)
+assert all(CTRL_DTYPE.fields[name][1] == getattr(SharedIPCBidirectional, name).offset for name in CTRL_DTYPE.names), \
+    "CTRL_DTYPE field offsets do not match SharedIPCBidirectional"
+
 # Global variables
 shm_fd = -1       
 mmap_obj = None   
 shm_struct = None 
+ctrl = None           # np.ndarray[CTRL_DTYPE] of length 1 over the control block
+ctrl_command = None   # ctrl['c_to_a_command'] field view
+ctrl_status = None    # ctrl['a_to_c_status'] field view
+ctrl_c2a_len = None   # ctrl['c_to_a_data_len'] field view
+ctrl_a2c_len = None   # ctrl['a_to_c_data_len'] field view
+# Cached int32 memoryview over the control block for Python-level reads: indexing it is a
+# direct 4-byte load, cheaper than NumPy scalar indexing or a struct.unpack_from call.
+ctrl_words = None
+CMD_WORD = SharedIPCBidirectional.c_to_a_command.offset // 4
+STATUS_WORD = SharedIPCBidirectional.a_to_c_status.offset // 4
+command_spin_view = None # What spin_for_command reads: ctrl_command (Numba) or ctrl_words
 running = True
-SHM_CONTROL_BLOCK_SIZE = ctypes.sizeof(SharedIPCBidirectional) # Should be 128
+SHM_CONTROL_BLOCK_SIZE = ctypes.sizeof(SharedIPCBidirectional) # 128 (asserted above)
 # Actual buffer sizes read from SHM
 ACTUAL_C2A_BUFFER_SIZE = 0 
 ACTUAL_A2C_BUFFER_SIZE = 0 
+A2C_OFFSET = 0 # SHM_CONTROL_BLOCK_SIZE + ACTUAL_C2A_BUFFER_SIZE, fixed once the sizes are read
+MAX_RESPONSE = 0 # Largest response that fits both the defined A2C size and the mapping, fixed at init
+# NumPy uint8 view over the A2C buffer in the mapping (responses are written here in place)
+a2c_array = None
+a2c_rgba_frame = None # (H, W, 4) view of the first EXAMPLE_RESPONSE_LEN bytes of a2c_array
+# Addresses of the 4-byte control words inside the mapping (used for futex)
+c_to_a_command_addr = None
+a_to_c_status_addr = None
 
 def signal_handler(sig, frame):
     global running
-    print(f"[IPC Python] Received signal {sig}. Attempting graceful shutdown...")
+    log.warning(f"[IPC Python] Received signal {sig}. Attempting graceful shutdown...")
     running = False # Signal main loop to stop
 
+def prefault_mapping(mm):
+    """Touches one byte per page so the page-table entries exist before the first request."""
+    for offset in range(0, len(mm), mmap.PAGESIZE):
+        mm[offset]
+
 def get_buffer_view(offset, length):
     """Gets a memoryview slice of the mmap object."""
     if mmap_obj and offset is not None and (offset + length) <= mmap_obj.size():
         try:
             return mmap_obj[offset:offset+length]
         except IndexError:
-             print(f"[IPC Python] Error: Buffer slice out of bounds - offset={offset}, length={length}, mmap_size={mmap_obj.size()}")
+             log.error(f"[IPC Python] Error: Buffer slice out of bounds - offset={offset}, length={length}, mmap_size={mmap_obj.size()}")
              return None
     else:
-        print(f"[IPC Python] Error: Invalid buffer access - mmap_obj={mmap_obj}, offset={offset}, length={length}, mmap_size={mmap_obj.size() if mmap_obj else 'N/A'}")
+        log.error(f"[IPC Python] Error: Invalid buffer access - mmap_obj={mmap_obj}, offset={offset}, length={length}, mmap_size={mmap_obj.size() if mmap_obj else 'N/A'}")
         return None
 
-def process_data_from_creator(data_len):
-    """Processes data received from the Creator (C++)."""
-    print(f"[IPC Python Acceptor] Received command: Process {data_len} bytes from Creator.")
+def stage_response_bytes(a2c_view, payload):
+    """Copies a pre-encoded reply (uint8 array, see REPLY_*) into the A2C buffer. Returns its length."""
+    payload_len = min(len(payload), len(a2c_view))
+    a2c_view[:payload_len] = payload[:payload_len]
+    return payload_len
+
+def process_data_from_creator(data_len, a2c_view):
+    """Processes data received from the Creator (C++), writing the response straight into a2c_view (the SHM A2C buffer).
+    Returns the number of response bytes written."""
+    log.debug("[IPC Python Acceptor] Received command: Process %d bytes from Creator.", data_len)
     if data_len > 0:
         # Check against the actual C2A buffer size
         if data_len > ACTUAL_C2A_BUFFER_SIZE:
-             print(f"[IPC Python Acceptor] Error: data_len ({data_len}) > ACTUAL_C2A_BUFFER_SIZE ({ACTUAL_C2A_BUFFER_SIZE})")
-             return b"Error: Creator data too large"
+             log.error(f"[IPC Python Acceptor] Error: data_len ({data_len}) > ACTUAL_C2A_BUFFER_SIZE ({ACTUAL_C2A_BUFFER_SIZE})")
+             return stage_response_bytes(a2c_view, REPLY_CREATOR_DATA_TOO_LARGE)
         try:
-            # Read from C2A buffer (offset is control block size)
-            c2a_buffer_offset = SHM_CONTROL_BLOCK_SIZE
-            c2a_buffer = get_buffer_view(c2a_buffer_offset, data_len)
-            if c2a_buffer is None:
-                 return b"Error: Failed to get C2A buffer view"
-            input_bytes = c2a_buffer
-            
-            # --- Example Processing --- 
-            width, height = 10, 10
-            gray_image = np.zeros((height, width), dtype=np.uint8)
-            for j in range(height):
-                for i in range(width):
-                    gray_image[j, i] =int(i * (255.0 / (width - 1)))
-            bgr_image = cv2.cvtColor(gray_image, cv2.COLOR_GRAY2BGR)
-            rgba_image = cv2.cvtColor(bgr_image, cv2.COLOR_BGR2RGBA)
-            response_data = rgba_image.tobytes()
+            # --- Example Processing (converted directly into SHM) --- 
+            if a2c_rgba_frame is None:
+                 log.error(f"[IPC Python Acceptor] Error: Response size ({EXAMPLE_RESPONSE_LEN}) exceeds A2C buffer ({len(a2c_view)}).")
+                 return stage_response_bytes(a2c_view, REPLY_RESPONSE_TOO_LARGE)
+            cv2.cvtColor(_GRADIENT_GRAY, cv2.COLOR_GRAY2RGBA, dst=a2c_rgba_frame)
             # -------------------------
 
-            print(f"[IPC Python Acceptor] Processing complete. Response size: {len(response_data)} bytes.")
-            return response_data
+            log.debug("[IPC Python Acceptor] Processing complete. Response size: %d bytes.", EXAMPLE_RESPONSE_LEN)
+            return EXAMPLE_RESPONSE_LEN
         except Exception as e:
-            print(f"[IPC Python Acceptor] Error processing data: {e}")
+            log.error(f"[IPC Python Acceptor] Error processing data: {e}")
             traceback.print_exc()
-            return b"Error during Python processing"
-    return b"Acknowledged empty Creator message" 
-
-def send_data_to_creator(data_bytes):
-    """Sends data back to the Creator (C++)."""
-    global shm_struct, mmap_obj, ACTUAL_C2A_BUFFER_SIZE, ACTUAL_A2C_BUFFER_SIZE 
-    if not shm_struct or not mmap_obj:
-        print("[IPC Python Acceptor] Error: Cannot send data, IPC not initialized.")
+            return stage_response_bytes(a2c_view, REPLY_PROCESSING_ERROR)
+    return stage_response_bytes(a2c_view, REPLY_EMPTY_ACK)
+
+def wait_for_creator_ready(timeout_sec=5.0):
+    """Waits until the Creator has consumed the previous response (a_to_c_status == 0),
+    i.e. until the A2C buffer may be overwritten. Returns False on shutdown or timeout.
+    Spins without touching the clock first; only the blocking phase checks the deadline."""
+    for _ in range(CREATOR_READY_SPIN_COUNT):
+        if ctrl_words[STATUS_WORD] == 0: return True
+        sched_yield()
+    deadline = time.monotonic() + timeout_sec
+    while True:
+        status = ctrl_words[STATUS_WORD]
+        if status == 0: return True
+        if not running: log.warning("[IPC Python Acceptor] Shutdown requested while waiting to send."); return False
+        if time.monotonic() > deadline: log.error("[IPC Python Acceptor] Error: Timeout waiting for Creator ack."); return False
+        futex_wait(a_to_c_status_addr, status)
+
+def signal_error_to_creator():
+    """Reports an error status (-1) with no payload to the Creator."""
+    ctrl_a2c_len[0] = 0
+    ctrl_status[0] = -1
+    futex_wake(a_to_c_status_addr)
+
+def send_data_to_creator(data_len):
+    """Publishes data_len bytes already written into the A2C buffer to the Creator (C++).
+    The caller must have waited for wait_for_creator_ready() before writing the buffer."""
+    assert ctrl is not None, "send_data_to_creator() called before IPC init"
+
+    # MAX_RESPONSE already covers both the defined A2C size and the mapped size
+    if data_len > MAX_RESPONSE:
+        log.error(f"[IPC Python Acceptor] Error: Response data size ({data_len}) exceeds A2C buffer ({MAX_RESPONSE}). Signaling error.")
+        signal_error_to_creator()
         return False
 
-    data_len = len(data_bytes)
-    
-    # Calculate offset using the actual C2A size read from SHM
-    a2c_buffer_offset = SHM_CONTROL_BLOCK_SIZE + ACTUAL_C2A_BUFFER_SIZE 
-    print(f"[IPC Python Acceptor] Calculated A2C offset: {a2c_buffer_offset}") 
-
-    # Check size against the actual A2C size read from SHM
-    if data_len > ACTUAL_A2C_BUFFER_SIZE:
-        print(f"[IPC Python Acceptor] Error: Response data size ({data_len}) exceeds ACTUAL_A2C_BUFFER_SIZE ({ACTUAL_A2C_BUFFER_SIZE}). Signaling error.")
-        while shm_struct.a_to_c_status != 0 and running: time.sleep(0.005) 
-        if not running: return False
-        shm_struct.a_to_c_data_len = 0
-        shm_struct.a_to_c_status = -1
-        return False
-
-    # --- Busy-wait for Creator to be ready --- 
-    wait_start_time = time.time()
-    while shm_struct.a_to_c_status != 0:
-        if not running: print("[IPC Python Acceptor] Shutdown requested while waiting to send."); return False
-        if time.time() - wait_start_time > 5.0: print("[IPC Python Acceptor] Error: Timeout waiting for Creator ack."); return False
-        time.sleep(0.005) 
-    # ---------------------------------------
-
     try:
-        # Write data using mmap seek and write at the corrected offset
-        if mmap_obj.size() < a2c_buffer_offset + data_len:
-            print(f"[IPC Python Acceptor] Error: Calculated write position ({a2c_buffer_offset + data_len}) exceeds mmap size ({mmap_obj.size()}).")
-            return False
-            
-        # --- Log data hex preview BEFORE writing ---
-        hex_preview_before_write = bytesToHexPreview(data_bytes)
-        print(f"[IPC Python Acceptor] PRE-WRITE Hex Preview: {hex_preview_before_write}")
+        # --- Log data hex preview of the staged response (debug only) ---
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("[IPC Python Acceptor] PRE-WRITE Hex Preview: %s", bytesToHexPreview(a2c_array.data[:data_len]))
         # -------------------------------------------
 
-        mmap_obj.seek(a2c_buffer_offset)
-        bytes_written = mmap_obj.write(data_bytes)
-
-        if bytes_written != data_len:
-             print(f"[IPC Python Acceptor] Warning: mmap.write wrote {bytes_written} bytes, expected {data_len}.")
-
-        # Flush changes
-        try:
-            mmap_obj.flush() 
-        except OSError as e:
-            print(f"[IPC Python Acceptor] Warning: mmap.flush failed: {e}") 
+        # No mmap.flush(): the segment is tmpfs-backed POSIX SHM, so msync has no
+        # backing store to write and the C++ reader sees the bytes through cache
+        # coherency. Visibility order is given by the stores below (buffer, then
+        # length, then status), which x86-64 never reorders with each other.
 
         # Set length first, then status
-        shm_struct.a_to_c_data_len = data_len 
-        shm_struct.a_to_c_status = 1
+        ctrl_a2c_len[0] = data_len 
+        ctrl_status[0] = 1
+        futex_wake(a_to_c_status_addr)
 
-        print(f"[IPC Python Acceptor] Response ({data_len} bytes) written to A2C buffer (mmap @{a2c_buffer_offset}). Status set to 1.")
+        log.debug("[IPC Python Acceptor] Response (%d bytes) written to A2C buffer (mmap @%d). Status set to 1.", data_len, A2C_OFFSET)
         return True
 
     except Exception as e:
-        print(f"[IPC Python Acceptor] Error sending data to Creator (mmap): {e}")
+        log.error(f"[IPC Python Acceptor] Error sending data to Creator (mmap): {e}")
         traceback.print_exc()
         # Attempt to signal error if possible
         try:
-            wait_start_time = time.time()
-            while shm_struct.a_to_c_status != 0:
-                 if not running: break
-                 if time.time() - wait_start_time > 0.5: break 
-                 time.sleep(0.005)
-            if running and shm_struct.a_to_c_status == 0:
-                 shm_struct.a_to_c_data_len = 0
-                 shm_struct.a_to_c_status = -1 
+            if running and ctrl_words[STATUS_WORD] == 0:
+                 signal_error_to_creator()
         except Exception as e_inner:
-             print(f"[IPC Python Acceptor] Error trying to signal send error: {e_inner}")
+             log.error(f"[IPC Python Acceptor] Error trying to signal send error: {e_inner}")
         return False
 
+def acknowledge_command():
+    """Resets c_to_a_command to 0 and wakes a Creator blocked on it. This is the only place the
+    Acceptor writes the command word. It is a plain aligned 4-byte store (single-copy atomic
+    on x86-64 and arm64), and no compare-exchange is needed: the Creator only writes a new
+    command after it has observed 0, so the word cannot change under us here."""
+    ctrl_command[0] = 0
+    futex_wake(c_to_a_command_addr)
+
+# --- Command spin loop (JIT-compiled when Numba is available) ---
+# Only this tight integer loop is jitted; dispatch (cv2, send) stays in Python.
+if HAVE_NUMBA:
+    COMMAND_SPIN_ITERS = 20000
+
+    @intrinsic
+    def _load_acquire_i32(typingctx, arr, idx):
+        """Atomic acquire load of arr[idx]. A plain load could be hoisted out of the loop by LLVM."""
+        if not (isinstance(arr, types.Array) and arr.ndim == 1 and arr.dtype == types.int32
+                and isinstance(idx, types.Integer)):
+            return None
+        def codegen(context, builder, signature, args):
+            aryty, idxty = signature.args
+            ary = context.make_array(aryty)(context, builder, args[0])
+            index = context.cast(builder, args[1], idxty, types.intp)
+            ptr = cgutils.get_item_pointer(context, builder, aryty, ary, [index])
+            return builder.load_atomic(ptr, 'acquire', 4)
+        return types.int32(arr, idx), codegen
+
+    @njit(nogil=True, cache=True)
+    def spin_for_command(command_view, spin_iters):
+        """Returns the first non-zero command seen within spin_iters reads, or 0."""
+        for _ in range(spin_iters):
+            command = _load_acquire_i32(command_view, 0)
+            if command != 0:
+                return command
+        return 0
+else:
+    COMMAND_SPIN_ITERS = FUTEX_SPIN_COUNT
+
+    def spin_for_command(command_view, spin_iters):
+        """Returns the first non-zero command seen within spin_iters reads, or 0."""
+        for _ in range(spin_iters):
+            command = command_view[CMD_WORD]
+            if command != 0:
+                return command
+            sched_yield()
+        return 0
+
+def wait_for_command():
+    """Spins on c_to_a_command, then blocks on it via futex while it stays 0."""
+    if spin_for_command(command_spin_view, COMMAND_SPIN_ITERS) == 0:
+        futex_wait(c_to_a_command_addr, 0)
+
+# --- CPU pinning / scheduling (Linux only) ---
+IPC_CPU_DEFAULT = 3
+
+def configure_worker_scheduling():
+    """Pins this thread to IPC_CPU (default 3, -1 disables) and, with IPC_SCHED_FIFO=1,
+    moves it to SCHED_FIFO priority 1. Failures only log; the loop runs either way."""
+    if not hasattr(os, "sched_setaffinity"): # e.g. macOS
+        log.debug("[IPC Python Acceptor] sched_setaffinity not available; CPU pinning skipped.")
+        return
+    cpu_env = os.environ.get('IPC_CPU')
+    try:
+        cpu = int(cpu_env) if cpu_env else IPC_CPU_DEFAULT
+        if cpu >= 0:
+            allowed = os.sched_getaffinity(0)
+            if cpu in allowed:
+                os.sched_setaffinity(0, {cpu})
+                log.debug("[IPC Python Acceptor] Pinned to CPU %d.", cpu)
+            elif cpu_env:
+                log.warning(f"[IPC Python Acceptor] Warning: IPC_CPU={cpu} not in allowed CPUs {sorted(allowed)}; not pinning.")
+            else:
+                log.debug("[IPC Python Acceptor] Default CPU %d not in allowed CPUs %s; not pinning.", cpu, sorted(allowed))
+    except (OSError, ValueError) as e:
+        log.warning(f"[IPC Python Acceptor] Warning: Could not set CPU affinity (IPC_CPU={cpu_env!r}): {e}")
+
+    # Opt-in: a FIFO thread that spins can starve a Creator sharing its core
+    if os.environ.get('IPC_SCHED_FIFO') == '1' and hasattr(os, "sched_setscheduler"):
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(1))
+            log.debug("[IPC Python Acceptor] Scheduling policy set to SCHED_FIFO (priority 1).")
+        except PermissionError:
+            log.warning("[IPC Python Acceptor] Warning: SCHED_FIFO needs CAP_SYS_NICE; keeping the default policy.")
+        except OSError as e:
+            log.warning(f"[IPC Python Acceptor] Warning: Could not set SCHED_FIFO: {e}")
+
 def main_loop(shm_name):
     global mmap_obj, shm_struct, running, ACTUAL_C2A_BUFFER_SIZE, ACTUAL_A2C_BUFFER_SIZE, shm_fd
-    print(f"[IPC Python Acceptor] Script started. PID: {os.getpid()}")
-    print(f"[IPC Python Acceptor] Using SHM name: {shm_name}")
+    global c_to_a_command_addr, a_to_c_status_addr, a2c_array, ctrl, ctrl_command, ctrl_status
+    global ctrl_words, command_spin_view, a2c_rgba_frame, ctrl_c2a_len, ctrl_a2c_len, A2C_OFFSET, MAX_RESPONSE
+    log.debug("[IPC Python Acceptor] Script started. PID: %d", os.getpid())
+    log.debug("[IPC Python Acceptor] Using SHM name: %s", shm_name)
+    configure_worker_scheduling()
 
     # --- Open Shared Memory using ctypes shm_open --- 
     shm_fd = -1
     encoded_shm_name = shm_name.encode('utf-8')
     attach_attempts = 5
     attach_delay = 0.1 # seconds
+    _shm_open = c_shm_open # Local binding for the retry loop
     for attempt in range(attach_attempts):
         # Open EXISTING shared memory (no O_CREAT)
-        shm_fd = c_shm_open(encoded_shm_name, O_RDWR, DEFAULT_SHM_MODE)
+        shm_fd = _shm_open(encoded_shm_name, O_RDWR, DEFAULT_SHM_MODE)
         if shm_fd != -1:
-            print(f"[IPC Python Acceptor] Successfully opened SHM '{shm_name}' via shm_open (fd={shm_fd}) on attempt {attempt + 1}.")
+            log.debug("[IPC Python Acceptor] Successfully opened SHM '%s' via shm_open (fd=%d) on attempt %d.", shm_name, shm_fd, attempt + 1)
             break # Success!
         else:
             # Get errno to understand why it failed
             errno = ctypes.get_errno()
-            print(f"[IPC Python Acceptor] shm_open failed for '{shm_name}' (attempt {attempt + 1}/{attach_attempts}, fd={shm_fd}, errno={errno}, msg='{os.strerror(errno)}'). Retrying in {attach_delay}s...")
+            log.warning(f"[IPC Python Acceptor] shm_open failed for '{shm_name}' (attempt {attempt + 1}/{attach_attempts}, fd={shm_fd}, errno={errno}, msg='{os.strerror(errno)}'). Retrying in {attach_delay}s...")
             if attempt == attach_attempts - 1:
-                 print(f"[IPC Python Acceptor] Error: Failed to open SHM via shm_open after {attach_attempts} attempts. Exiting.")
+                 log.error(f"[IPC Python Acceptor] Error: Failed to open SHM via shm_open after {attach_attempts} attempts. Exiting.")
                  sys.exit(1)
             time.sleep(attach_delay)
             attach_delay *= 1.5
@@ -263,46 +484,60 @@ def main_loop(shm_name):
     try:
         fstat_info = os.fstat(shm_fd)
         reported_shm_size = fstat_info.st_size
-        print(f"[IPC Python Acceptor] Obtained SHM size via fstat: {reported_shm_size} bytes (Expected: {SHM_CONTROL_BLOCK_SIZE + ACTUAL_C2A_BUFFER_SIZE + ACTUAL_A2C_BUFFER_SIZE}).")
+        log.debug("[IPC Python Acceptor] Obtained SHM size via fstat: %d bytes.", reported_shm_size)
         # Optional: Check if reported size is at least the expected size
         if reported_shm_size < SHM_CONTROL_BLOCK_SIZE + ACTUAL_C2A_BUFFER_SIZE + ACTUAL_A2C_BUFFER_SIZE:
-             print(f"[IPC Python Acceptor] Warning: fstat size ({reported_shm_size}) is less than expected size ({SHM_CONTROL_BLOCK_SIZE + ACTUAL_C2A_BUFFER_SIZE + ACTUAL_A2C_BUFFER_SIZE}). Potential issue.")
+             log.warning(f"[IPC Python Acceptor] Warning: fstat size ({reported_shm_size}) is less than expected size ({SHM_CONTROL_BLOCK_SIZE + ACTUAL_C2A_BUFFER_SIZE + ACTUAL_A2C_BUFFER_SIZE}). Potential issue.")
              # Decide whether to proceed or exit
     except Exception as e:
-        print(f"[IPC Python Acceptor] Error getting SHM size via fstat(fd={shm_fd}): {e}. Exiting.")
+        log.error(f"[IPC Python Acceptor] Error getting SHM size via fstat(fd={shm_fd}): {e}. Exiting.")
         if c_close and shm_fd != -1: c_close(shm_fd)
         sys.exit(1)
 
     # --- Map Shared Memory using mmap (map reported size) --- 
     try:
         # Map the actual size reported by fstat to avoid errors if it's larger
-        mmap_obj = mmap.mmap(shm_fd, reported_shm_size, access=mmap.ACCESS_WRITE, flags=mmap.MAP_SHARED)
-        print(f"[IPC Python Acceptor] Successfully memory-mapped SHM (fd={shm_fd}, size={reported_shm_size}).")
+        # MAP_POPULATE prefaults every page at map time so requests never take first-touch faults
+        mmap_obj = mmap.mmap(shm_fd, reported_shm_size, flags=mmap.MAP_SHARED | MAP_POPULATE,
+                             prot=mmap.PROT_READ | mmap.PROT_WRITE)
+        if not MAP_POPULATE:
+            prefault_mapping(mmap_obj)
+        log.debug("[IPC Python Acceptor] Successfully memory-mapped SHM (fd=%d, size=%d).", shm_fd, reported_shm_size)
     except Exception as e:
-         print(f"[IPC Python Acceptor] Error memory-mapping SHM (fd={shm_fd}, size={reported_shm_size}): {e}. Exiting.")
+         log.error(f"[IPC Python Acceptor] Error memory-mapping SHM (fd={shm_fd}, size={reported_shm_size}): {e}. Exiting.")
          if c_close and shm_fd != -1: c_close(shm_fd)
          sys.exit(1)
     # ------------------------------------ 
 
     # --- Map Control Structure --- 
+    struct_is_shared = False
     try:
         # Map the control block part first
         shm_struct = SharedIPCBidirectional.from_buffer(mmap_obj) 
-        print("[IPC Python Acceptor] Successfully mapped control structure using from_buffer.")
+        struct_is_shared = True
+        log.debug("[IPC Python Acceptor] Successfully mapped control structure using from_buffer.")
     except TypeError as e:
-         print(f"[IPC Python Acceptor] Warning: from_buffer failed ({e}). Trying from_buffer_copy...")
+         log.warning(f"[IPC Python Acceptor] Warning: from_buffer failed ({e}). Trying from_buffer_copy...")
          try:
               shm_struct = SharedIPCBidirectional.from_buffer_copy(mmap_obj[:SHM_CONTROL_BLOCK_SIZE])
-              print("[IPC Python Acceptor] Successfully mapped struct using from_buffer_copy.")
+              log.debug("[IPC Python Acceptor] Successfully mapped struct using from_buffer_copy.")
          except Exception as e_copy:
              # Ensure this block uses consistent spacing (e.g., 4 spaces per level)
-             print(f"[IPC Python Acceptor] Error creating ctypes structure from mmap buffer copy: {e_copy}. Exiting.")
+             log.error(f"[IPC Python Acceptor] Error creating ctypes structure from mmap buffer copy: {e_copy}. Exiting.")
              # Cleanup ONLY if from_buffer_copy fails
              if mmap_obj:
                  mmap_obj.close()
              if c_close and shm_fd != -1:
                  c_close(shm_fd)
              sys.exit(1)
+
+    # Futex needs the real address of the shared words; a from_buffer_copy fallback has none.
+    if c_syscall is not None and struct_is_shared:
+        base_addr = ctypes.addressof(shm_struct)
+        c_to_a_command_addr = base_addr + SharedIPCBidirectional.c_to_a_command.offset
+        a_to_c_status_addr = base_addr + SharedIPCBidirectional.a_to_c_status.offset
+    else:
+        log.debug("[IPC Python Acceptor] Note: futex not usable here; falling back to sleep polling.")
         
     # --- Read Defined Buffer Sizes from SHM --- 
     try:
@@ -310,89 +545,119 @@ def main_loop(shm_name):
         ACTUAL_A2C_BUFFER_SIZE = shm_struct.defined_a2c_buffer_size # Use renamed field
         if ACTUAL_C2A_BUFFER_SIZE <= 0 or ACTUAL_A2C_BUFFER_SIZE <= 0:
             raise ValueError("Buffer sizes read from SHM are zero or invalid.")
-        print(f"[IPC Python Acceptor] Read defined buffer sizes from SHM: C2A={ACTUAL_C2A_BUFFER_SIZE}, A2C={ACTUAL_A2C_BUFFER_SIZE}")
+        log.debug("[IPC Python Acceptor] Read defined buffer sizes from SHM: C2A=%d, A2C=%d (Control Size: %d)",
+                  ACTUAL_C2A_BUFFER_SIZE, ACTUAL_A2C_BUFFER_SIZE, SHM_CONTROL_BLOCK_SIZE)
         expected_total = SHM_CONTROL_BLOCK_SIZE + ACTUAL_C2A_BUFFER_SIZE + ACTUAL_A2C_BUFFER_SIZE
-        print(f"          (Control Size: {SHM_CONTROL_BLOCK_SIZE})")
         if expected_total > mmap_obj.size():
-             print(f"[IPC Python Acceptor] Warning: Sum of control block and defined buffer sizes ({expected_total}) exceeds mapped size ({mmap_obj.size()}).")
+             log.warning(f"[IPC Python Acceptor] Warning: Sum of control block and defined buffer sizes ({expected_total}) exceeds mapped size ({mmap_obj.size()}).")
              # Decide whether to proceed or exit
     except AttributeError:
-         print("[IPC Python Acceptor] Error: Failed to read defined buffer sizes from SHM struct. Structure mismatch?")
+         log.error("[IPC Python Acceptor] Error: Failed to read defined buffer sizes from SHM struct. Structure mismatch?")
          if mmap_obj: mmap_obj.close()
          if c_close and shm_fd != -1: c_close(shm_fd)
          sys.exit(1)
     except ValueError as e:
-         print(f"[IPC Python Acceptor] Error: {e}")
+         log.error(f"[IPC Python Acceptor] Error: {e}")
          if mmap_obj: mmap_obj.close()
          if c_close and shm_fd != -1: c_close(shm_fd)
          sys.exit(1)
     # -------------------------------------------
+
+    # --- NumPy view over the control block (hot-path field access) --- 
+    ctrl = np.frombuffer(mmap_obj, dtype=CTRL_DTYPE, count=1, offset=0)
+    ctrl_command = ctrl['c_to_a_command']
+    ctrl_status = ctrl['a_to_c_status']
+    ctrl_c2a_len = ctrl['c_to_a_data_len']
+    ctrl_a2c_len = ctrl['a_to_c_data_len']
+    ctrl_words = memoryview(mmap_obj)[:SHM_CONTROL_BLOCK_SIZE].cast('i')
+    command_spin_view = ctrl_command if HAVE_NUMBA else ctrl_words
+    spin_for_command(command_spin_view, 1) # Compile (or load cached) JIT spin loop before polling
+    # -------------------------------------------
+
+    # --- Zero-copy view over the A2C buffer --- 
+    A2C_OFFSET = SHM_CONTROL_BLOCK_SIZE + ACTUAL_C2A_BUFFER_SIZE
+    MAX_RESPONSE = max(0, min(ACTUAL_A2C_BUFFER_SIZE, reported_shm_size - A2C_OFFSET))
+    a2c_array = np.frombuffer(mmap_obj, dtype=np.uint8, count=MAX_RESPONSE, offset=A2C_OFFSET)
+    if MAX_RESPONSE >= EXAMPLE_RESPONSE_LEN:
+        a2c_rgba_frame = a2c_array[:EXAMPLE_RESPONSE_LEN].reshape(EXAMPLE_HEIGHT, EXAMPLE_WIDTH, 4)
+    log.debug("[IPC Python Acceptor] A2C buffer view: offset=%d, length=%d", A2C_OFFSET, MAX_RESPONSE)
+    # -------------------------------------------
         
     # --- Set up signal handlers --- 
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
 
-    print("[IPC Python Acceptor] Initialization complete. Polling for Creator commands...")
+    poll_mode = "ipc_loop" if ipc_loop is not None else ("numba" if HAVE_NUMBA else "python")
+    print(f"[IPC Python Acceptor] Ready (pid={os.getpid()}, shm={shm_name}, C2A={ACTUAL_C2A_BUFFER_SIZE}, "
+          f"A2C={ACTUAL_A2C_BUFFER_SIZE}, loop={poll_mode}). Polling for Creator commands...")
 
     # --- Main Polling Loop --- 
     try:
+        if ipc_loop is not None:
+            try:
+                ipc_loop.run_loop(shm_fd, reported_shm_size,
+                                  lambda data_len: process_data_from_creator(data_len, a2c_array),
+                                  keep_running=lambda: running)
+                running = False
+            except Exception as e:
+                log.error(f"[IPC Python Acceptor] Error in compiled ipc_loop: {e}. Falling back to the Python loop.")
+                traceback.print_exc()
+
         while running:
             try:
                 # Check command from Creator
-                command = shm_struct.c_to_a_command # Use c_to_a
-
-                if command == 1: # Data Ready from Creator
-                    data_len = shm_struct.c_to_a_data_len # Use c_to_a
-                    response_bytes = process_data_from_creator(data_len) # Call renamed func
-                    
-                    if response_bytes is not None:
-                        send_data_to_creator(response_bytes) # Call renamed func
+                command = ctrl_words[CMD_WORD] # Use c_to_a
+                if command == 0: # Idle
+                    wait_for_command()
+                    continue
+
+                try:
+                    if command == 1: # Data Ready from Creator
+                        data_len = int(ctrl_c2a_len[0]) # Use c_to_a
+                        # A2C buffer may only be overwritten once the Creator consumed the last response
+                        if wait_for_creator_ready():
+                            response_len = process_data_from_creator(data_len, a2c_array) # Writes into SHM
+                            send_data_to_creator(response_len) # Call renamed func
+
+                    elif command == 99: # Shutdown command from Creator
+                        log.info("[IPC Python Acceptor] Received shutdown command (99). Acknowledging and exiting.")
+                        running = False
+
                     else:
-                         send_data_to_creator(b"Error during Creator data processing in Acceptor") 
-                    
-                    # Acknowledge Creator command 
-                    shm_struct.c_to_a_command = 0 
-                    print("[IPC Python Acceptor] Acknowledged Creator command (set c_to_a_command = 0). Waiting...")
-
-                elif command == 99: # Shutdown command from Creator
-                    print("[IPC Python Acceptor] Received shutdown command (99). Acknowledging and exiting.")
-                    shm_struct.c_to_a_command = 0 # Acknowledge
-                    running = False
-                    break 
-
-                elif command == 0: # Idle
-                    time.sleep(0.005) 
-                else:
-                    print(f"[IPC Python Acceptor] Warning: Unknown command {command} received from Creator. Resetting.")
-                    shm_struct.c_to_a_command = 0 
-                    time.sleep(0.01) 
+                        log.warning(f"[IPC Python Acceptor] Warning: Unknown command {command} received from Creator. Resetting.")
+                finally:
+                    # Every non-idle command is acknowledged exactly once, even if handling raised
+                    acknowledge_command()
+                    log.debug("[IPC Python Acceptor] Acknowledged Creator command %d (set c_to_a_command = 0). Waiting...", command)
 
             except Exception as e:
-                 print(f"[IPC Python Acceptor] Error in main loop: {e}")
+                 log.error(f"[IPC Python Acceptor] Error in main loop: {e}")
                  traceback.print_exc()
-                 if shm_struct: 
-                     try:
-                         shm_struct.c_to_a_command = 0
-                     except Exception:
-                         pass
                  time.sleep(1) 
     finally:
-        print("[IPC Python Acceptor] Cleaning up resources...")
+        log.info("[IPC Python Acceptor] Cleaning up resources...")
+        # Release every buffer export (NumPy views, ctypes struct) before closing the mmap
+        a2c_array = a2c_rgba_frame = ctrl = ctrl_command = ctrl_status = command_spin_view = None
+        ctrl_c2a_len = ctrl_a2c_len = None
+        if ctrl_words is not None:
+            ctrl_words.release()
+            ctrl_words = None
+        shm_struct = None
         # Unmap memory
         if mmap_obj:
             try:
                 mmap_obj.close()
             except Exception as e:
-                print(f"Error closing mmap: {e}")
+                log.error(f"[IPC Python Acceptor] Error closing mmap: {e}")
         # Close file descriptor
         if c_close and shm_fd != -1:
             if c_close(shm_fd) == -1:
                  errno = ctypes.get_errno()
-                 print(f"[IPC Python Acceptor] Warning: Error closing shm_fd {shm_fd} (errno={errno}, msg='{os.strerror(errno)}').")
+                 log.warning(f"[IPC Python Acceptor] Warning: Error closing shm_fd {shm_fd} (errno={errno}, msg='{os.strerror(errno)}').")
             else:
-                 print(f"[IPC Python Acceptor] Closed shm_fd {shm_fd}.")
+                 log.info("[IPC Python Acceptor] Closed shm_fd %d.", shm_fd)
         # Do NOT unlink shm here, C++ (the creator) should handle that.
-        print("[IPC Python Acceptor] Script finished.")
+        log.info("[IPC Python Acceptor] Script finished.")
 
 
 if __name__ == "__main__":
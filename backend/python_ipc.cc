@@ -19,6 +19,12 @@
 #include <cstdlib>       // For system(), WEXITSTATUS, WIFEXITED etc.
 #include <cstring>       // For memcpy, memset
 #include <cerrno>        // For errno
+#include <ctime>         // For timespec
+
+#ifdef __linux__
+#include <linux/futex.h> // For FUTEX_WAIT, FUTEX_WAKE
+#include <sys/syscall.h> // For SYS_futex
+#endif
 
 // Global variables for Bi-directional IPC
 static int shm_fd_bi = -1;
@@ -53,9 +59,43 @@ std::string bytes_to_hex_preview_cpp(const uint8_t* data, size_t length, size_t
     return ss.str();
 }
 
-// --- Listener Thread Function (Busy-Wait Version) ---
+// --- Futex Helpers ---
+// The control words are plain 4-byte ints in a MAP_SHARED region, so the
+// shared (non-PRIVATE) futex ops work across the C++/Python process boundary.
+// On platforms without futex we fall back to a short sleep (old polling behavior).
+static const int FUTEX_SPIN_COUNT = 100;
+
+static void futex_wait_while_equal(std::atomic<int32_t>* word, int32_t expected, std::chrono::microseconds timeout) {
+#ifdef __linux__
+    struct timespec ts;
+    ts.tv_sec = static_cast<time_t>(timeout.count() / 1000000);
+    ts.tv_nsec = static_cast<long>((timeout.count() % 1000000) * 1000);
+    syscall(SYS_futex, reinterpret_cast<int32_t*>(word), FUTEX_WAIT, expected, &ts, nullptr, 0);
+#else
+    (void)word; (void)expected; (void)timeout;
+    std::this_thread::sleep_for(std::chrono::microseconds(500));
+#endif
+}
+
+static void futex_wake_all(std::atomic<int32_t>* word) {
+#ifdef __linux__
+    syscall(SYS_futex, reinterpret_cast<int32_t*>(word), FUTEX_WAKE, INT32_MAX, nullptr, nullptr, 0);
+#else
+    (void)word;
+#endif
+}
+
+// Spin briefly, then block until *word changes away from `expected` (or timeout).
+static void wait_while_equal(std::atomic<int32_t>* word, int32_t expected, std::chrono::microseconds timeout) {
+    for (int i = 0; i < FUTEX_SPIN_COUNT; ++i) {
+        if (word->load() != expected) return;
+    }
+    futex_wait_while_equal(word, expected, timeout);
+}
+
+// --- Listener Thread Function (Futex-Wait Version) ---
 void acceptor_listener_thread_func() { // Renamed function
-    std::cout << "[IPC C++ Listener] Listener thread for Acceptor started (polling mode)." << std::endl;
+    std::cout << "[IPC C++ Listener] Listener thread for Acceptor started (futex-wait mode)." << std::endl;
     while (keep_listener_running.load()) {
         if (!shm_ptr_bi) { 
             std::cerr << "[IPC C++ Listener] Error: Shared memory pointer is null. Exiting thread." << std::endl;
@@ -94,18 +134,21 @@ void acceptor_listener_thread_func() { // Renamed function
             }
             // Acknowledge processing by resetting Acceptor's status
             shm_ptr_bi->a_to_c_status.store(0); // Use a_to_c_status
+            futex_wake_all(&shm_ptr_bi->a_to_c_status);
             std::cout << "[IPC C++ Listener] Acknowledged Acceptor (set a_to_c_status = 0)." << std::endl;
 
         } else if (a_status == -1) { // Error status from Acceptor
             std::cerr << "[IPC C++ Listener] Received Error Status (-1) from Acceptor." << std::endl;
             shm_ptr_bi->a_to_c_status.store(0); // Use a_to_c_status
+            futex_wake_all(&shm_ptr_bi->a_to_c_status);
              std::cout << "[IPC C++ Listener] Acknowledged Acceptor Error (set a_to_c_status = 0)." << std::endl;
 
         } else if (a_status == 0) { // Idle status from Acceptor
-            std::this_thread::sleep_for(std::chrono::microseconds(500)); 
+            wait_while_equal(&shm_ptr_bi->a_to_c_status, 0, std::chrono::milliseconds(100));
         } else { // Unknown status
              std::cerr << "[IPC C++ Listener] Warning: Unknown Acceptor status code: " << a_status << ". Resetting." << std::endl;
              shm_ptr_bi->a_to_c_status.store(0); // Use a_to_c_status
+             futex_wake_all(&shm_ptr_bi->a_to_c_status);
              std::this_thread::sleep_for(std::chrono::milliseconds(10));
         }
     }
@@ -124,7 +167,7 @@ bool init_acceptor_ipc_bidirectional( // Renamed function
     shm_unlink(SHM_NAME_BI);
 
     // --- Create/Open Shared Memory --- 
-    size_t control_block_size = 128; 
+    size_t control_block_size = SHM_CONTROL_BLOCK_SIZE; 
     size_t total_shm_size = control_block_size + SHM_C2A_BUFFER_MAX_SIZE + SHM_A2C_BUFFER_MAX_SIZE; // Use renamed constants 
     std::cout << "[IPC C++] Calculated total SHM allocation size: " << total_shm_size << " bytes." << std::endl;
     std::cout << "          Control Block Size: " << control_block_size << std::endl;
@@ -196,6 +239,7 @@ void shutdown_acceptor_ipc_bidirectional() { // Renamed function
     // --- Stop Listener Thread --- 
     if (keep_listener_running.load()) {
         keep_listener_running.store(false);
+        if (shm_ptr_bi) futex_wake_all(&shm_ptr_bi->a_to_c_status); // Unblock a waiting listener
         if (listener_thread.joinable()) {
             listener_thread.join();
              std::cout << "[IPC C++] Listener thread joined." << std::endl;
@@ -206,6 +250,7 @@ void shutdown_acceptor_ipc_bidirectional() { // Renamed function
     if (shm_ptr_bi) {
         std::cout << "[IPC C++] Sending Shutdown command (99) to Acceptor..." << std::endl;
         shm_ptr_bi->c_to_a_command.store(99); // Use c_to_a_command
+        futex_wake_all(&shm_ptr_bi->c_to_a_command);
 
         // Optional: Wait briefly for Acceptor to acknowledge shutdown
         auto shutdown_start = std::chrono::steady_clock::now();
@@ -214,14 +259,14 @@ void shutdown_acceptor_ipc_bidirectional() { // Renamed function
                  std::cerr << "[IPC C++] Warning: Timeout waiting for Acceptor to acknowledge shutdown command." << std::endl;
                  break;
             }
-             std::this_thread::sleep_for(std::chrono::milliseconds(50));
+             futex_wait_while_equal(&shm_ptr_bi->c_to_a_command, 99, std::chrono::milliseconds(50));
         }
         if (shm_ptr_bi->c_to_a_command.load() == 0) { // Use c_to_a_command
              std::cout << "[IPC C++] Acceptor acknowledged shutdown command." << std::endl;
         }
 
         // Calculate total size for munmap using the MAX constants
-        size_t control_block_size = 128;
+        size_t control_block_size = SHM_CONTROL_BLOCK_SIZE;
         size_t total_shm_size = control_block_size + SHM_C2A_BUFFER_MAX_SIZE + SHM_A2C_BUFFER_MAX_SIZE;
         munmap(shm_ptr_bi, total_shm_size);
         shm_ptr_bi = nullptr;
@@ -250,9 +295,10 @@ bool send_data_to_acceptor_async(const uint8_t* input_data, size_t input_len) {
         return false;
      }
 
-     // --- Busy-wait for Acceptor to be ready --- 
+     // --- Wait (spin, then futex) for Acceptor to be ready --- 
      auto wait_start_time = std::chrono::steady_clock::now();
-     while (shm_ptr_bi->c_to_a_command.load() != 0) { // Use c_to_a_command
+     int32_t pending_command;
+     while ((pending_command = shm_ptr_bi->c_to_a_command.load()) != 0) { // Use c_to_a_command
          if (!keep_listener_running.load()) { 
              std::cerr << "[IPC C++] Aborting send: Shutdown in progress." << std::endl;
              return false;
@@ -262,7 +308,7 @@ bool send_data_to_acceptor_async(const uint8_t* input_data, size_t input_len) {
                        << shm_ptr_bi->c_to_a_command.load() << "). Sending failed." << std::endl;
              return false; 
          }
-         std::this_thread::sleep_for(std::chrono::microseconds(500)); 
+         wait_while_equal(&shm_ptr_bi->c_to_a_command, pending_command, std::chrono::milliseconds(100));
      }
      // ---------------------------------------
 
@@ -270,6 +316,7 @@ bool send_data_to_acceptor_async(const uint8_t* input_data, size_t input_len) {
      memcpy(shm_ptr_bi->buffer_c_to_a, input_data, input_len); // Use buffer_c_to_a
      shm_ptr_bi->c_to_a_data_len.store(input_len); // Use c_to_a_data_len
      shm_ptr_bi->c_to_a_command.store(1); // Use c_to_a_command
+     futex_wake_all(&shm_ptr_bi->c_to_a_command);
      std::cout << "[IPC C++] Data written to C->A SHM (" << input_len << " bytes). Command set to 1." << std::endl;
      return true;
 }
@@ -19,6 +19,8 @@ const size_t SHM_A2C_BUFFER_MAX_SIZE = 1024 * 1024 * 2; // Acceptor -> Creator (
 // --- Shared Memory Structure ---
 // IMPORTANT: Ensure total size and layout (including padding) EXACTLY 
 // matches the Python ctypes.Structure definition.
+// c_to_a_command and a_to_c_status double as futex words on Linux: each side
+// blocks on them with FUTEX_WAIT and issues FUTEX_WAKE after every store.
 struct SharedIPCBidirectional {
     // --- Control block --- 
     // Atomics for status/commands
@@ -32,10 +34,10 @@ struct SharedIPCBidirectional {
     
     // Padding to ensure alignment and consistent control block size.
     // Let's pad to 128 bytes for potential cache alignment benefits.
-    // Calculation assumes atomic<int32> is 4, atomic<size_t> is 8, size_t is 8.
-    // Current size = 4*2 + 8*2 + 8*2 = 8 + 16 + 16 = 40 bytes.
-    // Padding needed = 128 - 40 = 88 bytes.
-    char _padding1[128 - sizeof(std::atomic<int32_t>)*2 - sizeof(std::atomic<size_t>)*2 - sizeof(size_t)*2]; 
+    // Layout (64-bit, natural alignment): int32 fields sit at 0 and 16 and are
+    // each followed by 4 bytes of implicit padding before the next size_t, so
+    // the fields above end at offset 48. Padding needed = 128 - 48 = 80 bytes.
+    char _padding1[80]; 
     // --- End Control Block (Total 128 bytes) ---
 
     // Data Buffers (Allocated based on MAX size constants)
@@ -43,9 +45,15 @@ struct SharedIPCBidirectional {
     char buffer_a_to_c[SHM_A2C_BUFFER_MAX_SIZE]; // Use RX max size
 };
 
-// Ensure the struct size calculation reflects the padding goal
-static_assert(sizeof(SharedIPCBidirectional::_padding1) == (128 - sizeof(std::atomic<int32_t>)*2 - sizeof(std::atomic<size_t>)*2 - sizeof(size_t)*2),
-              "Padding calculation error in SharedIPCBidirectional");
+// Size of the control block that precedes the data buffers (mirrored by the Python script).
+const size_t SHM_CONTROL_BLOCK_SIZE = 128;
+
+// Ensure the control block is exactly SHM_CONTROL_BLOCK_SIZE bytes so the buffer
+// offsets match the Python side and the total SHM size computed from the constants.
+static_assert(offsetof(SharedIPCBidirectional, buffer_c_to_a) == SHM_CONTROL_BLOCK_SIZE,
+              "Control block of SharedIPCBidirectional must be exactly 128 bytes");
+static_assert(sizeof(SharedIPCBidirectional) == SHM_CONTROL_BLOCK_SIZE + SHM_C2A_BUFFER_MAX_SIZE + SHM_A2C_BUFFER_MAX_SIZE,
+              "Unexpected trailing padding in SharedIPCBidirectional");
 
 // --- Callback Type for Received Data ---
 // This callback will be invoked by the C++ listener thread when data arrives from Python.
@@ -56,7 +64,8 @@ typedef std::function<void(const uint8_t* data, size_t length)> AcceptorDataCall
 // --- IPC Management Functions ---
 
 /**
- * @brief Initializes the Bi-directional IPC channel using busy-wait flags.
+ * @brief Initializes the Bi-directional IPC channel using futex-backed flags
+ *        (short spin, then kernel wait; plain polling where futex is unavailable).
  * @param python_executable Path to the python executable.
  * @param script_path Path to the python_bidirectional_ipc_script.py.
  * @param callback The function to call when data is received from Python.